@@ -4,24 +4,37 @@ import polars as pl
 
 DATA_DIR = S.DATA_DIR
 
+# zstd (level 3) keeps the files small; row-group statistics let the split scans skip row groups
+PARQUET_OPTS = dict(compression="zstd", compression_level=3, statistics=True)
+
+
+def _shape(path) -> tuple[int, int]:
+    lf = pl.scan_parquet(path)
+    return lf.select(pl.len()).collect().item(), lf.collect_schema().len()
+
+
 # ------------------------------------------------------------------#
 # A. Build the full modelling table
 # ------------------------------------------------------------------#
-df = normalize_time(S.DATA_PATH)
-df = create_full_grid(df)
-df = df.with_columns(is_holiday_month(pl.col("month")).alias("holiday_month"))
-df = add_population_data(df)
-df = add_imd_data(df)
-df = add_housing_data(df)
-df = add_temporal_features(df)
-df = add_revictimization_risk(df)
-df = df.collect()
-df = add_neighbor_features(df)
-df = filter_residential_lsoas(df)
-
-# save the COMPLETE table
+grid = normalize_time(S.DATA_PATH).pipe(create_full_grid)
+
+# drop non-residential LSOAs before any feature work; neighbours still see the full grid
+df = (
+    grid
+    .pipe(filter_residential_lsoas)
+    .with_columns(is_holiday_month(pl.col("month")).alias("holiday_month"))
+    .pipe(add_population_data)
+    .pipe(add_imd_data)
+    .pipe(add_housing_data)
+    .pipe(add_temporal_features)
+    .pipe(add_revictimization_risk)
+    .pipe(add_neighbor_features, source_df=grid)
+)
+
+# save the COMPLETE table (row-group statistics let the split scans prune)
 full_path = DATA_DIR / "features.parquet"
-df.write_parquet(full_path)
+df.sink_parquet(full_path, **PARQUET_OPTS)
+features = pl.scan_parquet(full_path)
 
 # ------------------------------------------------------------------#
 # B. Train-test split (70 / 30, reproducible)
@@ -29,32 +42,33 @@ df.write_parquet(full_path)
 target_col = "burglary_count"
 
 # Find the 70% cutoff point in time_index_norm
-max_time_index = df.select(pl.col("time_index_norm").max()).item()
+max_time_index = features.select(pl.col("time_index_norm").max()).collect().item()
 split_time_index = max_time_index * 0.7
 
-# Split based on time_index_norm
-train_df = df.filter(pl.col("time_index_norm") <= split_time_index)
-test_df = df.filter(pl.col("time_index_norm") > split_time_index)
+# Split based on time_index_norm, filters are pushed into the parquet scan
+train_lf = features.filter(pl.col("time_index_norm") <= split_time_index)
+test_lf = features.filter(pl.col("time_index_norm") > split_time_index)
 
-X_train = train_df.drop(target_col)
-y_train = train_df.select(target_col)
-
-X_test = test_df.drop(target_col)
-y_test = test_df.select(target_col)
+splits = {
+    "X_train": train_lf.drop(target_col),
+    "X_test":  test_lf.drop(target_col),
+    "y_train": train_lf.select(target_col),
+    "y_test":  test_lf.select(target_col),
+}
 
 # ------------------------------------------------------------------#
 # C. Persist everything
 # ------------------------------------------------------------------#
-X_train.write_parquet(DATA_DIR / "X_train.parquet")
-X_test.write_parquet (DATA_DIR / "X_test.parquet")
-y_train.write_parquet(DATA_DIR / "y_train.parquet")
-y_test.write_parquet (DATA_DIR / "y_test.parquet")
+for name, lf in splits.items():
+    lf.sink_parquet(DATA_DIR / f"{name}.parquet", **PARQUET_OPTS)
+
+shapes = {name: _shape(DATA_DIR / f"{name}.parquet") for name in ["features", *splits]}
 
 print(
     "✓ files saved:\n"
-    f"  • {full_path.name}    : {df.shape[0]:,} rows × {df.shape[1]} cols\n"
-    f"  • X_train.parquet     : {X_train.shape[0]:,} rows × {X_train.shape[1]} cols\n"
-    f"  • X_test.parquet      : {X_test.shape[0]:,} rows × {X_test.shape[1]} cols\n"
-    f"  • y_train.parquet     : {y_train.shape[0]:,} rows\n"
-    f"  • y_test.parquet      : {y_test.shape[0]:,} rows"
-)
\ No newline at end of file
+    f"  • {full_path.name}    : {shapes['features'][0]:,} rows × {shapes['features'][1]} cols\n"
+    f"  • X_train.parquet     : {shapes['X_train'][0]:,} rows × {shapes['X_train'][1]} cols\n"
+    f"  • X_test.parquet      : {shapes['X_test'][0]:,} rows × {shapes['X_test'][1]} cols\n"
+    f"  • y_train.parquet     : {shapes['y_train'][0]:,} rows\n"
+    f"  • y_test.parquet      : {shapes['y_test'][0]:,} rows"
+)
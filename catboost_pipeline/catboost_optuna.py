@@ -6,13 +6,15 @@ import numpy as np
 import pandas as pd
 import polars as pl
 import optuna
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
 from catboost import CatBoostRegressor, Pool
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from sklearn.metrics import root_mean_squared_error, mean_absolute_error, r2_score
 
 # Data utilities
-def read_parquet_file(file_path: str) -> pl.DataFrame:
-    """Load a parquet file into a Polars DataFrame."""
-    return pl.read_parquet(file_path)
+def scan_parquet_file(file_path: str) -> pl.LazyFrame:
+    """Lazily scan a parquet file into a Polars LazyFrame."""
+    return pl.scan_parquet(file_path)
 
 
 def load_dataset_splits(x_train_p: str, y_train_p: str, x_test_p: str, y_test_p: str
@@ -20,55 +22,67 @@ def load_dataset_splits(x_train_p: str, y_train_p: str, x_test_p: str, y_test_p:
     """
     Read feature/target parquet splits and convert to pandas / numpy.
 
-    The column ``LSOA code`` is cast to categorical exactly like the XGBoost script.
+    The column ``LSOA code`` is cast to categorical exactly like the XGBoost script;
+    the cast runs inside the scan so each split is materialised only once. Both
+    splits share one category dictionary, so equal codes mean equal LSOAs.
     """
+    lsoa_dtype = pl.Enum(
+        pl.concat([scan_parquet_file(p).select("LSOA code") for p in (x_train_p, x_test_p)])
+        .unique()
+        .drop_nulls()
+        .sort("LSOA code")
+        .collect()
+        .to_series()
+    )
+
     X_train = (
-        read_parquet_file(x_train_p)
-        .with_columns(pl.col("LSOA code").cast(pl.Categorical))
+        scan_parquet_file(x_train_p)
+        .with_columns(pl.col("LSOA code").cast(lsoa_dtype))
+        .collect(engine="streaming")
         .to_pandas()
     )
-    y_train = read_parquet_file(y_train_p).to_numpy().ravel()
+    y_train = scan_parquet_file(y_train_p).collect().to_series().to_numpy()
 
     X_test = (
-        read_parquet_file(x_test_p)
-        .with_columns(pl.col("LSOA code").cast(pl.Categorical))
+        scan_parquet_file(x_test_p)
+        .with_columns(pl.col("LSOA code").cast(lsoa_dtype))
+        .collect(engine="streaming")
         .to_pandas()
     )
-    y_test = read_parquet_file(y_test_p).to_numpy().ravel()
+    y_test = scan_parquet_file(y_test_p).collect().to_series().to_numpy()
 
     return X_train, X_test, y_train, y_test
 
 
 def _cat_feature_indices(df: pd.DataFrame) -> list[int]:
     """Return column indices with dtype 'object' or 'category' for CatBoost."""
-    return [
-        idx
-        for idx, dtype in enumerate(df.dtypes)
-        if dtype == "object" or str(dtype).startswith("category")
-    ]
+    cat_cols = df.select_dtypes(include=["object", "category"]).columns
+    return df.columns.get_indexer(cat_cols).tolist()
 
 # Single-objective train/eval
-def train_and_evaluate_single_objective(params_template: Dict[str, Any], loss_name: str, X_tr: pd.DataFrame,
-                                        y_tr: np.ndarray, X_val: pd.DataFrame, y_val: np.ndarray, cat_idx: list[int]) -> float:
-    """Train CatBoost with *loss_name* and return validation RMSE."""
+def train_and_evaluate_single_objective(params_template: Dict[str, Any], loss_name: str, train_pool: Pool,
+                                        val_pool: Pool, y_val: np.ndarray) -> float:
+    """Train CatBoost with *loss_name* on pre-built pools and return validation RMSE."""
     params = params_template.copy()
     params["loss_function"] = loss_name
 
-    train_pool = Pool(X_tr, y_tr, cat_features=cat_idx)
-    val_pool = Pool(X_val, y_val, cat_features=cat_idx)
-
     model = CatBoostRegressor(**params)
     model.fit(train_pool, eval_set=val_pool, verbose=False)
 
     preds = model.predict(val_pool)
-    rmse = np.sqrt(mean_squared_error(y_val, preds))
+    rmse = root_mean_squared_error(y_val, preds)
     return rmse
 
 # Optuna objective
 def define_objective(X_tr: pd.DataFrame, y_tr: np.ndarray, X_val: pd.DataFrame,
                      y_val: np.ndarray) -> Callable[[optuna.trial.Trial], float]:
-    """Return Optuna objective that samples **GPU-valid** CatBoost parameters."""
+    """Return Optuna objective that samples **GPU-valid** CatBoost parameters.
+
+    The train/validation pools are built once here and shared by every trial.
+    """
     cat_idx = _cat_feature_indices(X_tr)
+    train_pool = Pool(X_tr, y_tr, cat_features=cat_idx)
+    val_pool = Pool(X_val, y_val, cat_features=cat_idx)
 
     def objective(trial: optuna.trial.Trial) -> float:
         params: Dict[str, Any] = {
@@ -94,32 +108,41 @@ def define_objective(X_tr: pd.DataFrame, y_tr: np.ndarray, X_val: pd.DataFrame,
         else:  # Bernoulli
             params["subsample"] = trial.suggest_float("subsample", 0.4, 1.0)
 
-        # Evaluate two loss functions and return the best RMSE
-        losses = ["RMSE", "Poisson"]
-        rmse_per_loss: dict[str, float] = {}
+        # The loss function is searched jointly with the other hyper-parameters
+        loss = trial.suggest_categorical("loss_function", ["RMSE", "Poisson"])
 
-        for loss in losses:
-            rmse = train_and_evaluate_single_objective(
-                params, loss, X_tr, y_tr, X_val, y_val, cat_idx
-            )
-            rmse_per_loss[loss] = rmse
-
-        best_loss = min(rmse_per_loss, key=rmse_per_loss.get)
-        trial.set_user_attr("best_loss_function", best_loss)
-        return rmse_per_loss[best_loss]
+        return train_and_evaluate_single_objective(
+            params, loss, train_pool, val_pool, y_val
+        )
 
     return objective
 
 # Hyper-parameter search
 def run_hyperparameter_optimization(objective_callable: Callable[[optuna.trial.Trial], float],
-                                    n_trials: int = 30) -> Dict[str, Any]:
-    """Run Optuna and return best param dict (incl. winning loss_function)."""
+                                    n_trials: int = 30, n_jobs: int = 1, storage: str | None = None,
+                                    study_name: str | None = None) -> Dict[str, Any]:
+    """Run Optuna and return best param dict (incl. winning loss_function).
+
+    Pass an RDB *storage* (e.g. ``"sqlite:///optuna.db"``) and *study_name* to let
+    several processes share one study; *n_trials* then caps the total across all of them.
+    """
     optuna.logging.set_verbosity(optuna.logging.WARNING)
-    study = optuna.create_study(direction="minimize")
-    study.optimize(objective_callable, n_trials=n_trials, show_progress_bar=True)
+    study = optuna.create_study(
+        direction="minimize",
+        storage=storage,
+        study_name=study_name,
+        load_if_exists=True,
+    )
+    study.optimize(
+        objective_callable,
+        n_trials=n_trials,
+        n_jobs=n_jobs,
+        # only completed trials count, so a resumed study is not stopped by old failed ones
+        callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE,))],
+        show_progress_bar=True,
+    )
 
     best_params = study.best_params.copy()
-    best_params["loss_function"] = study.best_trial.user_attrs["best_loss_function"]
     print("Best hyper-parameters:", best_params)
     return best_params
 
@@ -138,10 +161,10 @@ def train_final_model(params: Dict[str, Any], X_tr: pd.DataFrame, y_tr: np.ndarr
 # Evaluation
 def evaluate_final_model(model: CatBoostRegressor, X_te: pd.DataFrame, y_te: np.ndarray) -> Tuple[float, float, float]:
     """Return (MAE, RMSE, R²) for the test set, printing nice output."""
-    test_pool = Pool(X_te, cat_features=_cat_feature_indices(X_te))
-    preds = model.predict(test_pool)
+    # The fitted model already knows its categorical features
+    preds = model.predict(X_te)
 
-    rmse = np.sqrt(mean_squared_error(y_te, preds))
+    rmse = root_mean_squared_error(y_te, preds)
     mae = mean_absolute_error(y_te, preds)
     r2 = r2_score(y_te, preds)
 
@@ -1,5 +1,7 @@
 import polars as pl
-from .io import to_dataframe
+from .io import to_lazyframe
+
+_HOLIDAY_MONTHS = (4, 7, 8, 10, 12)
 
 def create_full_grid(df, location_col="LSOA code", count_col="burglary_count") -> pl.LazyFrame:
     """Generates data table for burglaries per LSOA and month.
@@ -12,9 +14,14 @@ def create_full_grid(df, location_col="LSOA code", count_col="burglary_count") -
     Returns:
         pl.LazyFrame: LazyFrame with full grid.
     """
-    data = to_dataframe(df)
+    # stays lazy so the scan, cross-join and fill are planned as one query
+    data = to_lazyframe(df)
     unique_locations = data.select(location_col).unique()
-    unique_months = data.select(["year","month","month_sin","month_cos","time_index_norm"]).unique()
+    # the time encodings are fixed by (year, month), so only hash those two keys
+    unique_months = (
+        data.select(["year","month","month_sin","month_cos","time_index_norm"])
+            .unique(subset=["year","month"], keep="any")
+    )
     full_grid = unique_locations.join(unique_months, how="cross")
 
     aggregated = (
@@ -25,10 +32,11 @@ def create_full_grid(df, location_col="LSOA code", count_col="burglary_count") -
     return (
         full_grid.join(aggregated, on=[location_col,"year","month"], how="left")
             .with_columns(pl.col(count_col).fill_null(0))
-            .lazy()
     )
 
 
 def is_holiday_month(df, month_col="month") -> pl.Expr:
     """Boolean expression marking UK extended-holiday months."""
-    return pl.col(month_col).is_in([4,7,8,10,12])
+    # gather from a table indexed by month number (slot 0 unused), no per-row hashing
+    table = pl.Series([m in _HOLIDAY_MONTHS for m in range(13)])
+    return pl.lit(table).gather(pl.col(month_col))
@@ -1,10 +1,11 @@
+import re
 import polars as pl
-from .io import to_dataframe
+from .io import to_lazyframe, read_parquet_cached
 from . import settings as _S
 from typing import List
 
 def _load_pop(path=_S.POP_PATH, loc="LSOA code") -> pl.DataFrame:
-    pop = pl.read_parquet(path)
+    pop = read_parquet_cached(path)
     if "LSOA 2021 Code" in pop.columns:
         pop = pop.rename({"LSOA 2021 Code": loc})
     return pop
@@ -15,25 +16,28 @@ def load_population_long(path=_S.POP_PATH, loc="LSOA code") -> pl.DataFrame:
     pop_cols = [c for c in pop.columns if "Mid-" in c and "Population" in c]
     dens_cols = [c for c in pop.columns if "Mid-" in c and "Sq Km" in c]
 
-    pop_long = (
-        pop.select([loc]+pop_cols)
-            .melt(id_vars=[loc], variable_name="year_col", value_name="population")
-            .with_columns(pl.col("year_col").str.extract(r"(\d{4})").cast(pl.Int32).alias("year"))
-            .drop("year_col")
-    )
+    # pair the population and density column of each year, no melt + self-join needed
+    dens_by_year = {int(re.search(r"(\d{4})", c).group(1)): c for c in dens_cols}
 
-    dens_long = (
-        pop.select([loc]+dens_cols)
-            .melt(id_vars=[loc], variable_name="year_col", value_name="population_density")
-            .with_columns(pl.col("year_col").str.extract(r"(\d{4})").cast(pl.Int32).alias("year"))
-            .drop("year_col")
-    )
+    frames = []
+    for pc in pop_cols:
+        year = int(re.search(r"(\d{4})", pc).group(1))
+        if year in dens_by_year:
+            frames.append(pop.select([
+                loc,
+                pl.lit(year, dtype=pl.Int32).alias("year"),
+                pl.col(pc).alias("population"),
+                pl.col(dens_by_year[year]).alias("population_density"),
+            ]))
+    return pl.concat(frames, how="vertical_relaxed", rechunk=False)
 
-    return pop_long.join(dens_long, on=[loc,"year"], how="inner")
 
+def predict_missing_years(pop_data: pl.DataFrame, missing_years: List[int] | pl.LazyFrame,
+                          loc: str = "LSOA code") -> pl.DataFrame | pl.LazyFrame:
+    """Linear-trend extrapolation when burglars out-run the ONS :)
 
-def predict_missing_years(pop_data: pl.DataFrame, missing_years: List[int], loc: str = "LSOA code") -> pl.DataFrame:
-    """Linear-trend extrapolation when burglars out-run the ONS :)"""
+    ``missing_years`` is a list of years, or a lazy one-column ``year`` frame (giving a lazy result).
+    """
     trends = (
         pop_data.group_by(loc).agg([
             pl.col("population").first().alias("pop_start"),
@@ -51,38 +55,40 @@ def predict_missing_years(pop_data: pl.DataFrame, missing_years: List[int], loc:
         ])
     )
 
-    rows = []
-    for y in missing_years:
-        rows.append(
-            trends.with_columns([
-                pl.lit(y).alias("year"),
-                (pl.col("pop_end")  + pl.col("pop_trend")  * (y - pl.col("yr_end"))).round().cast(pl.Int64)
-                    .alias("population"),
-                (pl.col("dens_end") + pl.col("dens_trend") * (y - pl.col("yr_end")))
-                    .alias("population_density"),
-            ]).select([loc, "year", "population", "population_density"])
-        )
-    return pl.concat(rows)
+    # one cross-join against the missing years instead of a frame per year
+    if isinstance(missing_years, pl.LazyFrame):
+        trends, years = trends.lazy(), missing_years
+    else:
+        years = pl.DataFrame({"year": missing_years}, schema={"year": pl.Int32})
+    return (
+        trends.join(years, how="cross")
+        .with_columns([
+            (pl.col("pop_end")  + pl.col("pop_trend")  * (pl.col("year") - pl.col("yr_end"))).round().cast(pl.Int64)
+                .alias("population"),
+            (pl.col("dens_end") + pl.col("dens_trend") * (pl.col("year") - pl.col("yr_end")))
+                .alias("population_density"),
+        ])
+        .select([loc, "year", "population", "population_density"])
+    )
 
 
 def add_population_data(df, pop_path: str = _S.POP_PATH, loc: str = "LSOA code") -> pl.LazyFrame:
     """Attach population & density columns to the burglary table (and predict future years)."""
-    main = to_dataframe(df)
+    main = to_lazyframe(df)
     pop  = load_population_long(pop_path, loc)
 
-    main_years = main.get_column("year").unique().to_list()
-    pop_years  = pop.get_column("year").unique().to_list()
-    missing    = [y for y in main_years if y not in pop_years]
-
-    if missing:
-        preds = predict_missing_years(pop, missing, loc)
-        schema = [loc, "year", "population", "population_density"]
-        pop    = pop.select(schema)
-        preds  = preds.select(schema)
+    # years the ONS table does not cover, found lazily so the upstream plan runs only once
+    missing = main.select(pl.col("year").unique()).join(
+        pop.lazy().select(pl.col("year").unique()), on="year", how="anti"
+    )
 
-        pop = pl.concat([pop, preds], rechunk=True)
+    schema = [loc, "year", "population", "population_density"]
+    pop = pl.concat([
+        pop.lazy().select(schema),
+        predict_missing_years(pop, missing, loc).select(schema),
+    ])
 
-    return main.join(pop, on=[loc, "year"], how="left").lazy()
+    return main.join(pop, on=[loc, "year"], how="left")
 
 def add_imd_data(
     df,
@@ -92,23 +98,32 @@ def add_imd_data(
     loc: str = "LSOA code",
 ) -> pl.LazyFrame:
     """Join the right IMD snapshot for the given year."""
-    main     = to_dataframe(df)
-    imd_2010 = pl.read_parquet(imd10)
-    imd_2015 = pl.read_parquet(imd15)
-    imd_2019 = pl.read_parquet(imd19)
-
-    return pl.concat([
-        main.filter(pl.col("year").is_between(2010, 2014)).join(imd_2010, on=loc, how="left"),
-        main.filter(pl.col("year").is_between(2015, 2018)).join(imd_2015, on=loc, how="left"),
-        main.filter(pl.col("year") >= 2019).join(imd_2019, on=loc, how="left"),
-    ]).sort([loc, "year", "month"]).lazy()
+    # one snapshot id per row, so all three scans go through a single join;
+    # years before 2010 have no snapshot and are dropped as before
+    main = to_lazyframe(df).with_columns(
+        pl.when(pl.col("year") >= 2019).then(19)
+          .when(pl.col("year") >= 2015).then(15)
+          .when(pl.col("year") >= 2010).then(10)
+          .alias("imd_snapshot")
+    )
+    imd = pl.concat([
+        pl.scan_parquet(path).with_columns(pl.lit(snapshot).alias("imd_snapshot"))
+        for path, snapshot in ((imd10, 10), (imd15, 15), (imd19, 19))
+    ])
+
+    return (
+        main.drop_nulls("imd_snapshot")
+            .join(imd, on=[loc, "imd_snapshot"], how="left")
+            .drop("imd_snapshot")
+            .sort([loc, "year", "month"])
+    )
 
 
 def add_housing_data(df, housing_path: str = _S.HOUSING_PATH, loc: str = "LSOA code") -> pl.LazyFrame:
     """Join property-type fractions; drop AREA_NAME and fill nulls with 0."""
-    main = to_dataframe(df)
-    hdf  = pl.read_parquet(housing_path).drop("AREA_NAME")
+    main = to_lazyframe(df)
+    hdf  = read_parquet_cached(housing_path).drop("AREA_NAME")
 
-    joined = main.join(hdf, on=loc, how="left")
+    joined = main.join(hdf.lazy(), on=loc, how="left")
     h_cols = [c for c in hdf.columns if c != loc]
-    return joined.with_columns(pl.col(h_cols).fill_null(0)).lazy()
\ No newline at end of file
+    return joined.with_columns(pl.col(h_cols).fill_null(0))
\ No newline at end of file
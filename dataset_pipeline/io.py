@@ -1,4 +1,5 @@
 import polars as pl
+from functools import lru_cache
 from typing import Union, overload
 from pathlib import Path
 from . import settings as _S
@@ -32,3 +33,14 @@ def to_dataframe(df: DFLike) -> pl.DataFrame:
     if isinstance(df, pl.LazyFrame):
         return df.collect()
     raise TypeError("df must be path, DataFrame or LazyFrame")
+
+
+@lru_cache(maxsize=32)
+def _read_parquet_cached(path: str, mtime: float) -> pl.DataFrame:
+    return pl.read_parquet(path)
+
+
+def read_parquet_cached(path: PathLike) -> pl.DataFrame:
+    """``pl.read_parquet`` memoised on path + mtime, so static lookup tables decode once per process."""
+    path = Path(path).resolve()
+    return _read_parquet_cached(str(path), path.stat().st_mtime)
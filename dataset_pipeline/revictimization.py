@@ -1,13 +1,36 @@
+import numpy as np
 import polars as pl
-from .io import to_dataframe
+from numba import njit, prange
+from .io import to_lazyframe
+
+def _timing_weights(max_lag: int) -> np.ndarray:
+    """Timing factor of lags 1..max_lag, clipped at 0."""
+    lags = np.arange(1, max_lag + 1, dtype=np.float64)
+    return np.maximum(0.106 * lags ** -0.383 - 0.018, 0.0)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _lagged_risk(counts: np.ndarray, starts: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted sum of the previous ``len(weights)`` counts, restarted at every group start."""
+    n = counts.shape[0]
+    max_lag = weights.shape[0]
+    out = np.zeros(n)
+    for g in prange(starts.shape[0]):
+        start = starts[g]
+        end = starts[g + 1] if g + 1 < starts.shape[0] else n
+        for i in range(start, end):
+            s = 0.0
+            for l in range(1, min(max_lag, i - start) + 1):
+                s += counts[i - l] * weights[l - 1]
+            out[i] = s
+    return out
 
-def _timing_factor(lag_expr: pl.Expr) -> pl.Expr:
-    val = 0.106 * lag_expr.pow(-0.383) - 0.018
-    return pl.when(lag_expr <= 0).then(0.0).otherwise(pl.max_horizontal(val, pl.lit(0.0)))
 
 def add_revictimization_risk(df, max_lag: int = 24, prob: float = 0.134) -> pl.LazyFrame:
     """Compute revictimization risk, based on the previous months burglary counts.
 
+    The input frame is not modified; a new LazyFrame is returned.
+
     Args:
         df: Dataframe.
         max_lag: Looks back this many months.
@@ -16,18 +39,24 @@ def add_revictimization_risk(df, max_lag: int = 24, prob: float = 0.134) -> pl.L
     Returns:
         pl.LazyFrame: LazyFrame with revictimization risk column.
     """
-    df = to_dataframe(df).clone()
-    df = df.with_columns(pl.datetime(pl.col("year"), pl.col("month"), 1).alias("month_dt"))
-    df = df.sort(["LSOA code","month_dt"])
+    weights = _timing_weights(max_lag)
+
+    def _risk(s: pl.Series) -> pl.Series:
+        counts = s.struct.field("burglary_count").to_numpy()
+        starts = np.flatnonzero(s.struct.field("new_lsoa").to_numpy())
+        return pl.Series(prob * _lagged_risk(counts, starts, weights))
 
-    lag_cols = [(
-        pl.col("burglary_count").shift(l).over("LSOA code").fill_null(0) * _timing_factor(pl.lit(float(l)))
-    ).alias(f"lag_{l}_w") for l in range(1, max_lag+1)]
+    # same key as add_temporal_features, so an already sorted panel is re-sorted in linear time
+    df = to_lazyframe(df)
+    df = df.sort(["LSOA code","year","month"])
 
-    df = df.with_columns(lag_cols)
+    # rows are sorted per LSOA, so the kernel only needs to know where each LSOA starts
     df = df.with_columns(
-        (prob * pl.sum_horizontal([f"lag_{l}_w" for l in range(1, max_lag+1)]))
+        pl.struct(
+            pl.col("burglary_count").fill_null(0).cast(pl.Float64),
+            (pl.col("LSOA code") != pl.col("LSOA code").shift(1)).fill_null(True).alias("new_lsoa"),
+        ).map_batches(_risk, return_dtype=pl.Float64)
         .alias("revictimization_risk")
-    ).drop([f"lag_{l}_w" for l in range(1, max_lag+1)] + ["month_dt"])
+    )
 
-    return df.lazy()
\ No newline at end of file
+    return df
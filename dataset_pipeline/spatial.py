@@ -1,10 +1,12 @@
 import polars as pl
+from .io import to_lazyframe
 from . import settings as _S
 
-def add_neighbor_features(main_df: pl.DataFrame,
+def add_neighbor_features(main_df,
                           neighbors_path=_S.NEIGH_PATH,
                           location_col="LSOA code",
-                          target="burglary_count") -> pl.DataFrame:
+                          target="burglary_count",
+                          source_df=None) -> pl.LazyFrame:
     """Adds features related to the nearest neighbors.
 
     Args:
@@ -12,43 +14,51 @@ def add_neighbor_features(main_df: pl.DataFrame,
         neighbors_path: Path to neighbors file.
         location_col: Column name for location.
         target: Target column.
+        source_df: Dataframe the neighbors' target values are taken from,
+            e.g. the unfiltered grid when main_df has already been filtered.
+            Defaults to main_df.
 
     Returns:
-        pl.DataFrame: DataFrame with neighbor features.
+        pl.LazyFrame: LazyFrame with neighbor features.
     """
-    neighbors = pl.read_parquet(neighbors_path)
+    main_df = to_lazyframe(main_df)
+    source_df = main_df if source_df is None else to_lazyframe(source_df)
+    # only neighbour lists of LSOAs in main_df; the neighbour side is left alone so
+    # excluded LSOAs still count as neighbours
+    neighbors = pl.scan_parquet(neighbors_path).join(
+        main_df.select(pl.col(location_col).unique().alias("lsoa_code")),
+        on="lsoa_code",
+        how="semi"
+    )
 
-    expanded = main_df.join(
+    # only the keys travel through the per-neighbour expansion
+    expanded = main_df.select([location_col,"year","month"]).join(
         neighbors,
         left_on=location_col,
         right_on="lsoa_code",
         how="left"
     ).join(
-        main_df.select([location_col,"year","month",target]),
+        source_df.select([location_col,"year","month",pl.col(target).alias("burglary_count_neighbor")]),
         left_on=["neighbor_code","year","month"],
         right_on=[location_col,"year","month"],
-        how="left",
-        suffix="_neighbor"
+        how="left"
     )
 
-    neighbor_weighted = expanded.with_columns([
-        (1/(pl.col("distance")+100)).alias("w"),
-        (pl.col("burglary_count_neighbor")/ (pl.col("distance")+100)).alias("w_val")
-    ])
-
-    spatial_features = neighbor_weighted.group_by([location_col,"year","month"]).agg([
+    # inverse-distance weights are computed inside the sums, never stored as columns
+    w = 1/(pl.col("distance")+100)
+    spatial_features = expanded.group_by([location_col,"year","month"]).agg([
         pl.col("burglary_count_neighbor").mean().alias("neighbor_burglary_avg"),
         pl.col("burglary_count_neighbor").max().alias("neighbor_burglary_max"),
         pl.col("burglary_count_neighbor").std().alias("neighbor_burglary_std"),
-        (pl.col("w_val").sum() / pl.col("w").sum()).alias("neighbor_burglary_weighted_avg"),
+        ((pl.col("burglary_count_neighbor")*w).sum() / w.sum()).alias("neighbor_burglary_weighted_avg"),
         pl.col("burglary_count_neighbor").filter(pl.col("neighbor_rank")==1).first().alias("closest_neighbor_burglary")
     ])
 
     return main_df.join(spatial_features, on=[location_col,"year","month"], how="left")
 
 
-def filter_residential_lsoas(df: pl.DataFrame, lsoa_col: str = "LSOA code",
-                             residential_classification_path: str = _S.RES_CLASS_PATH) -> pl.DataFrame:
+def filter_residential_lsoas(df: pl.DataFrame | pl.LazyFrame, lsoa_col: str = "LSOA code",
+                             residential_classification_path: str = _S.RES_CLASS_PATH) -> pl.DataFrame | pl.LazyFrame:
     """Filter dataframe to only include residential-dominant LSOAs
 
     Args:
@@ -57,14 +67,14 @@ def filter_residential_lsoas(df: pl.DataFrame, lsoa_col: str = "LSOA code",
         residential_classification_path: Path to residential classification file.
 
     Returns:
-        pl.DataFrame: Filtered dataframe.
+        pl.DataFrame | pl.LazyFrame: Filtered dataframe, same type as df.
     """
 
-    residential_df = pl.read_csv(residential_classification_path)
-
-    residential_lsoas = residential_df.filter(
+    residential_df = pl.read_csv(residential_classification_path).filter(
         pl.col("is_residential_dominant") == True
-    ).select("LSOA21CD").to_series().to_list()
+    ).select(pl.col("LSOA21CD").alias(lsoa_col))
 
-    # Filter the main dataframe
-    return df.filter(pl.col(lsoa_col).is_in(residential_lsoas))
\ No newline at end of file
+    # Filter the main dataframe; a semi-join keeps row order and stays lazy for LazyFrames
+    if isinstance(df, pl.LazyFrame):
+        residential_df = residential_df.lazy()
+    return df.join(residential_df, on=lsoa_col, how="semi")
@@ -1,11 +1,11 @@
 from __future__ import annotations
+from functools import lru_cache
 from typing import Union
 import polars as pl
 import numpy as np
-from .io import to_dataframe, to_lazyframe
+from .io import to_lazyframe
 
 DFLike = Union[str, pl.DataFrame, pl.LazyFrame]
-WEIGHTS_CACHE: dict[int, list[int]] = {}
 
 def normalize_time(df, date_col: str = "Month") -> pl.LazyFrame:
     """Adds normalized time columns.
@@ -22,34 +22,32 @@ def normalize_time(df, date_col: str = "Month") -> pl.LazyFrame:
     # Parse Month column once
     lf = lf.with_columns(pl.col(date_col).str.strptime(pl.Date, "%Y-%m").alias("Month_dt"))
 
-    # Compute min/max eager (small)
-    _tmp = lf.select(pl.col("Month_dt").dt.year().min().alias("ymin"),
-                     pl.col("Month_dt").dt.year().max().alias("ymax")).collect()
-    ymin, ymax = _tmp.row(0)
-
-    # Normalised index parameters
-    idx_expr = (
-        (pl.col("Month_dt").dt.year() - ymin) * 12 + (pl.col("Month_dt").dt.month() - 1)
-    )
-    _range = (ymax - ymin) * 12 or 1  # avoid zero-div
+    # Normalised index parameters; column min/max are broadcast inside the plan, no eager pre-pass
+    year = pl.col("Month_dt").dt.year()
+    idx_expr = year * 12 + (pl.col("Month_dt").dt.month() - 1)
+    span = (year.max() - year.min()) * 12
+    _range = pl.when(span == 0).then(1).otherwise(span)  # avoid zero-div
+    angle = (pl.col("Month_dt").dt.month() - 1) * (np.pi / 6)
 
     return (
         lf.with_columns([
             pl.col("Month_dt").dt.year().alias("year"),
             pl.col("Month_dt").dt.month().alias("month"),
-            # cyclic encodings
-            np.sin((pl.col("Month_dt").dt.month() - 1) * (np.pi / 6)).alias("month_sin"),
-            np.cos((pl.col("Month_dt").dt.month() - 1) * (np.pi / 6)).alias("month_cos"),
+            # cyclic encodings (native Polars trig, no NumPy round-trip)
+            angle.sin().alias("month_sin"),
+            angle.cos().alias("month_cos"),
             # scaled index 0-1
             ((idx_expr - idx_expr.min()) / _range).alias("time_index_norm"),
         ])
         .drop("Month_dt")
     )
 
-def _weights(n: int) -> list[int]:
+@lru_cache(maxsize=64)
+def _weights(n: int) -> tuple[int, ...]:
     if n < 1:
         raise ValueError("period must be ≥ 1")
-    return WEIGHTS_CACHE.setdefault(n, list(range(1, n + 1)))
+    # immutable, since every caller shares the cached value
+    return tuple(range(1, n + 1))
 
 def _nan_fill(s: pl.Expr | pl.Series) -> pl.Expr | pl.Series:
     return s.fill_null(float("nan"))
@@ -63,7 +61,7 @@ def wma_pl(s: pl.Expr | pl.Series, period: int) -> pl.Expr | pl.Series:
     x = _nan_fill(s)
     wma = x.rolling_mean(
         window_size=period,
-        weights=_weights(period),
+        weights=list(_weights(period)),
         min_periods=period,
     )
     out = _mask_nan_to_null(wma)
@@ -92,14 +90,21 @@ def add_temporal_features(df: DFLike, *, location_col: str = "LSOA code", target
 
     Feature columns will simply contain `null` for the early periods.
     """
-    main = to_dataframe(df).sort([location_col, "year", "month"])
+    main = to_lazyframe(df).sort([location_col, "year", "month"])
+
+    # Per-LSOA shifts reused by several features, materialised once
+    shifted = {k: f"_{target_col}_shift_{k}" for k in (3, 6, 9, 12)}
+    main = main.with_columns([
+        pl.col(target_col).shift(k).over(location_col).alias(name) for k, name in shifted.items()
+    ])
+    s3, s6, s9, s12 = (pl.col(shifted[k]) for k in (3, 6, 9, 12))
 
     # Lag features
     lags = (
         pl.col(target_col).shift(1).over(location_col).alias(f"{target_col}_lag_1"),
-        pl.col(target_col).shift(3).over(location_col).alias(f"{target_col}_lag_3"),
-        pl.col(target_col).shift(6).over(location_col).alias(f"{target_col}_lag_6"),
-        pl.col(target_col).shift(12).over(location_col).alias(f"{target_col}_lag_12"),
+        s3.alias(f"{target_col}_lag_3"),
+        s6.alias(f"{target_col}_lag_6"),
+        s12.alias(f"{target_col}_lag_12"),
     )
 
     # Exponential Weighted Moving averages
@@ -123,26 +128,18 @@ def add_temporal_features(df: DFLike, *, location_col: str = "LSOA code", target
         .alias(f"{target_col}_active_3"),
 
         # % change (t-3 vs t-6)
-        safe_div(
-            pl.col(target_col).shift(3) - pl.col(target_col).shift(6),
-            pl.col(target_col).shift(6)
-        ).over(location_col).alias(f"{target_col}_pct_change"),
+        safe_div(s3 - s6, s6).alias(f"{target_col}_pct_change"),
 
         # σ / μ volatility over last 6 months
-        safe_div(
-            pl.col(target_col).shift(3).rolling_std(6),
-            pl.col(target_col).shift(3).rolling_mean(6)
-        ).over(location_col).alias(f"{target_col}_volatility_6m"),
+        safe_div(s3.rolling_std(6), s3.rolling_mean(6)).over(location_col).alias(f"{target_col}_volatility_6m"),
 
         # short / long trend ratio
-        safe_div(
-            pl.col(target_col).shift(3).rolling_mean(3),
-            pl.col(target_col).shift(9).rolling_mean(3)
-        ).over(location_col).alias(f"{target_col}_trend_ratio"),
+        safe_div(s3.rolling_mean(3), s9.rolling_mean(3)).over(location_col).alias(f"{target_col}_trend_ratio"),
     )
 
     return (
         main.with_columns([
             *lags, *ewms, *hmas, *extras,
-        ]).lazy()
+        ])
+        .drop(list(shifted.values()))
     )
\ No newline at end of file
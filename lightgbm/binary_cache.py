@@ -0,0 +1,25 @@
+from pathlib import Path
+
+import lightgbm as lgb
+
+DATA_DIR = Path("../data")
+
+
+def binned_dataset(X, y, name: str, reference: lgb.Dataset | None = None,
+                   categorical_feature="auto") -> lgb.Dataset:
+    """LightGBM Dataset for ``X``/``y``, binned once and reloaded from ``../data/<name>.bin``.
+
+    The binary is rebuilt whenever ``../data/<name>.parquet`` is newer than it, so a
+    fresh ``build_dataset.py`` run is picked up. ``y`` always overrides the stored
+    label, which lets scripts with different targets share one binary.
+    """
+    source = DATA_DIR / f"{name}.parquet"
+    binary = DATA_DIR / f"{name}.bin"
+
+    if binary.exists() and binary.stat().st_mtime >= source.stat().st_mtime:
+        return lgb.Dataset(str(binary), label=y, reference=reference)
+
+    ds = lgb.Dataset(X, y, reference=reference, categorical_feature=categorical_feature,
+                     free_raw_data=False)
+    ds.save_binary(str(binary))
+    return ds
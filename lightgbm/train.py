@@ -0,0 +1,168 @@
+import argparse
+import re
+import warnings
+
+import lightgbm as lgb
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import polars as pl
+from sklearn.metrics import (accuracy_score, classification_report, confusion_matrix,
+                             mean_absolute_error, mean_squared_error, r2_score)
+
+from binary_cache import binned_dataset
+
+warnings.filterwarnings("ignore")
+
+OBJECTIVES = ("classification", "regression", "poisson")
+
+# regex to catch any character other than letters, numbers, or underscore
+bad_pattern = re.compile(r'[^\w]')
+
+
+def clean_column_names(df):
+    df.columns = [bad_pattern.sub('_', col) for col in df.columns]
+    return df
+
+
+def _load():
+    """Read the four splits once; every requested arm reuses them."""
+    x_train = clean_column_names(pd.read_parquet("../data/X_train.parquet"))
+    x_test  = clean_column_names(pd.read_parquet("../data/X_test.parquet"))
+    y_train = pd.read_parquet("../data/y_train.parquet")
+    y_test  = pd.read_parquet("../data/y_test.parquet")
+
+    print(x_test.info())
+
+    bad_cols = [col for col in x_train.columns if bad_pattern.search(col)]
+    print("Columns with problematic characters:", bad_cols)
+
+    x_train["LSOA_code"] = x_train["LSOA_code"].astype("category")
+    # same categories as training, so the category codes match the ones binned into X_train.bin
+    x_test["LSOA_code"]  = pd.Categorical(x_test["LSOA_code"], categories=x_train["LSOA_code"].cat.categories)
+
+    target_col = y_train.columns[0]
+    return x_train, x_test, y_train[target_col], y_test[target_col]
+
+
+def run_classification(x_train, x_test, y_train, y_test):
+    # every observed count is a class; LightGBM wants them encoded as 0..K-1
+    classes = np.unique(y_train.values)
+
+    # shares the cached X_train.bin with the regression arms, only the label differs
+    dtrain = binned_dataset(x_train, np.searchsorted(classes, y_train.values), "X_train",
+                            categorical_feature=["LSOA_code"])
+    params = {
+        "objective": "multiclass",
+        "num_class": len(classes),
+        "verbosity": -1,
+    }
+    clf = lgb.train(params, dtrain)
+
+    def predict(X):
+        return classes[clf.predict(X).argmax(axis=1)]
+
+    y_pred = predict(x_test)
+
+    accuracy = accuracy_score(y_test, y_pred)
+    train_accuracy = accuracy_score(y_train, predict(x_train))
+    print('LightGBM Model accuracy score: {0:0.4f}'.format(accuracy))
+    print('Training-set accuracy score: {0:0.4f}'.format(train_accuracy))
+
+    print('Training set score: {:.4f}'.format(train_accuracy))
+    print('Test set score: {:.4f}'.format(accuracy))
+
+    cm = confusion_matrix(y_test, y_pred)
+    print('Confusion matrix\n\n', cm)
+    print('\nTrue Positives(TP) = ', cm[0,0])
+    print('\nTrue Negatives(TN) = ', cm[1,1])
+    print('\nFalse Positives(FP) = ', cm[0,1])
+    print('\nFalse Negatives(FN) = ', cm[1,0])
+    print(classification_report(y_test, y_pred))
+
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    mae  = mean_absolute_error(y_test, y_pred)
+    print(f"Test RMSE: {rmse:.4f}")
+    print(f"Test MAE:  {mae:.4f}")
+    return y_pred
+
+
+def run_regression(x_train, x_test, y_train, y_test, objective="regression"):
+    # binned once, later runs and arms load the cached binaries
+    dtrain = binned_dataset(x_train, y_train, "X_train", categorical_feature=["LSOA_code"])
+    dtest  = binned_dataset(x_test, y_test, "X_test", reference=dtrain)
+
+    params = {
+        "objective": objective,
+        "metric": ["rmse", "mae"],
+        "random_state": 42,
+        "verbosity": -1,
+    }
+    reg = lgb.train(
+        params, dtrain,
+        valid_sets=[dtrain, dtest],
+        valid_names=['train','test'],
+    )
+    y_pred = reg.predict(x_test)
+
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    mae  = mean_absolute_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+    print(f"Test RMSE: {rmse:.4f}")
+    print(f"Test MAE:  {mae:.4f}")
+    print(f"Test R2:  {r2:.4f}")
+    return y_pred
+
+
+def plot_monthly_average(x_test, y_test, y_pred, title):
+    # only the columns the plot needs, aggregated in Polars; pandas only for matplotlib
+    results = pl.DataFrame({
+        "year":      x_test["year"].to_numpy(),
+        "month":     x_test["month"].to_numpy(),
+        "LSOA_code": x_test["LSOA_code"].cat.codes.to_numpy(),
+        "Actual":    y_test.to_numpy(),
+        "Predicted": y_pred,
+    })
+
+    time_avg = (
+        results
+        .group_by(["year", "month", "LSOA_code"])
+        .agg(pl.col("Actual").mean().alias("avg_actual"), pl.col("Predicted").mean().alias("avg_predicted"))
+        .group_by(["year", "month"])
+        .agg(pl.col("avg_actual").mean(), pl.col("avg_predicted").mean())
+        .with_columns(pl.date("year", "month", 1).alias("year_month"))
+        .sort("year_month")
+        .to_pandas()
+    )
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(time_avg["year_month"], time_avg["avg_actual"], label="Actual", marker='o')
+    plt.plot(time_avg["year_month"], time_avg["avg_predicted"], label="Predicted", marker='x')
+    plt.xlabel("Time")
+    plt.ylabel("Average Burglary Count per LSOA")
+    plt.title(title)
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Train the baseline LightGBM models on the saved splits")
+    p.add_argument("--objective", nargs="+", choices=OBJECTIVES, default=["poisson"],
+                   help="one or more arms to run on a single load of the data")
+    return p
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    x_train, x_test, y_train, y_test = _load()
+
+    for objective in args.objective:
+        print(f"--- {objective} ---")
+        if objective == "classification":
+            y_pred = run_classification(x_train, x_test, y_train, y_test)
+        else:
+            y_pred = run_regression(x_train, x_test, y_train, y_test, objective)
+        plot_monthly_average(x_test, y_test, y_pred,
+                             f"Average Predicted vs Actual Burglary Counts across all LSOAs ({objective})")
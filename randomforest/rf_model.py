@@ -2,13 +2,10 @@ import polars as pl
 import numpy as np
 import logging
 from pathlib import Path
-from sklearn.pipeline import Pipeline
-from sklearn.impute import SimpleImputer
-from sklearn.ensemble import RandomForestRegressor
+import lightgbm as lgb
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, explained_variance_score
-from sklearn.experimental import enable_halving_search_cv # noqa
-from sklearn.model_selection import HalvingRandomSearchCV
-from scipy.stats import randint
+from sklearn.model_selection import train_test_split
+import optuna
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,55 +31,74 @@ y_test  = pl.read_parquet(PATH / "y_test.parquet")[TARGET].to_numpy()
 logger.info(f"X_train shape: {X_train_pl.shape}, X_test shape: {X_test_pl.shape}")
 logger.info(f"y_train shape: {y_train.shape}, y_test shape: {y_test.shape}")
 
-X_train = X_train_pl.to_numpy()
-X_test  = X_test_pl.to_numpy()
+# one contiguous float32 buffer per split (half the bytes of float64, no mixed-dtype upcast)
+X_train = X_train_pl.select(pl.all().cast(pl.Float32)).to_numpy(order='c', writable=True)
+X_test  = X_test_pl.select(pl.all().cast(pl.Float32)).to_numpy(order='c', writable=True)
 feat_names = X_train_pl.columns
 logger.info(f"Number of features: {len(feat_names)}")
 
-# Pipeline
-base_rf = RandomForestRegressor(
+# Median imputation, computed once on the training data instead of per fold and candidate
+medians = np.nanmedian(X_train, axis=0)
+np.copyto(X_train, np.broadcast_to(medians, X_train.shape), where=np.isnan(X_train))
+np.copyto(X_test, np.broadcast_to(medians, X_test.shape), where=np.isnan(X_test))
+
+# Model: LightGBM in random-forest mode (bagged, un-boosted trees on pre-binned histograms).
+# rf mode needs row bagging on every iteration, so subsample stays below 1 and subsample_freq=1
+base_rf = lgb.LGBMRegressor(
+    boosting_type='rf',
+    subsample=0.8,
+    subsample_freq=1,
+    colsample_bytree=0.8,
     n_jobs=-1,
     random_state=42,
-    verbose=0
+    verbose=-1
 )
 
-imputer = SimpleImputer(strategy="median")
-
-search_pipe = Pipeline([
-    ("impute", imputer),
-    ("rf", base_rf)
-])
-
-param_distributions = {
-    'rf__n_estimators': randint(50, 300),
-    'rf__max_depth': [None] + list(randint(5, 30).rvs(5)),
-    'rf__min_samples_split': randint(2, 20),
-    'rf__min_samples_leaf': randint(1, 20),
-    'rf__max_features': ['sqrt', 'log2', 0.5, 0.7, 1.0]
-}
-
-n_initial_candidates = 20
-halving_search = HalvingRandomSearchCV(
-    estimator=search_pipe,
-    param_distributions=param_distributions,
-    n_candidates=n_initial_candidates,
-    factor=3,
-    resource='n_samples',
-    min_resources='smallest',
-    cv=5,
-    scoring='neg_mean_absolute_error',
-    verbose=2,
-    random_state=42,
-    n_jobs=-1
-)
+N_TRIALS = 40
+TIMEOUT  = 1800  # seconds
+
+# single held-out validation fold instead of 5-fold CV on every candidate
+X_tr, X_val, y_tr, y_val = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+
+
+def pruning_callback(trial: optuna.trial.Trial):
+    """Report the validation MAE after every tree so weak trials stop early."""
+    def _callback(env):
+        mae_so_far = next(score for _, metric, score, _ in env.evaluation_result_list if metric == 'l1')
+        trial.report(mae_so_far, step=env.iteration)
+        if trial.should_prune():
+            raise optuna.TrialPruned()
+    return _callback
+
+
+def objective(trial: optuna.trial.Trial) -> float:
+    params = {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 300),
+        'max_depth': trial.suggest_categorical('max_depth', [-1] + list(range(5, 30))),
+        'num_leaves': trial.suggest_int('num_leaves', 31, 512),
+        'min_child_samples': trial.suggest_int('min_child_samples', 1, 40),
+        'subsample': trial.suggest_float('subsample', 0.5, 0.95),
+        'colsample_bytree': trial.suggest_categorical('colsample_bytree', [0.3, 0.5, 0.7, 1.0]),
+    }
+    model = lgb.LGBMRegressor(**{**base_rf.get_params(), **params})
+    model.fit(X_tr, y_tr, eval_set=[(X_val, y_val)], eval_metric='l1',
+              callbacks=[pruning_callback(trial)])
+    return mean_absolute_error(y_val, model.predict(X_val))
+
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+study = optuna.create_study(direction='minimize', sampler=optuna.samplers.TPESampler(seed=42),
+                            pruner=optuna.pruners.MedianPruner(n_warmup_steps=10))
 
-logger.info("Starting hyperparameter tuning with HalvingRandomSearchCV...")
-halving_search.fit(X_train, y_train)
+logger.info(f"Starting hyperparameter tuning with Optuna ({N_TRIALS} trials)...")
+study.optimize(objective, n_trials=N_TRIALS, timeout=TIMEOUT)
 logger.info("Hyperparameter tuning complete.")
+logger.info(f"Best parameters found: {study.best_params}")
+logger.info(f"Best validation MAE: {study.best_value:.4f}")
 
-best_model = halving_search.best_estimator_
-logger.info(f"Best parameters found: {halving_search.best_params_}")
-logger.info(f"Best cross-validation score (neg MAE): {halving_search.best_score_:.4f}")
+# refit the winner on the full training split
+best_model = lgb.LGBMRegressor(**{**base_rf.get_params(), **study.best_params})
+best_model.fit(X_train, y_train)
 
 logger.info("Generating predictions on the test set using the best model...")
 preds  = np.clip(best_model.predict(X_test), 0, None)
@@ -104,9 +120,13 @@ logger.info(f"{'EV':<5}: {evs:>10.4f}")
 logger.info("--- End of Report ---")
 
 # Top importances (from the best model)
-if hasattr(best_model.named_steps["rf"], 'feature_importances_'):
-    imp = best_model.named_steps["rf"].feature_importances_
-    top = sorted(zip(feat_names, imp), key=lambda x: -x[1])[:15]
+if hasattr(best_model, 'feature_importances_'):
+    imp = best_model.feature_importances_
+    # partial sort: only the k largest get ordered (k < 15 on narrow feature sets)
+    k = min(15, len(imp))
+    idx = np.argpartition(imp, -k)[-k:]
+    idx = idx[np.argsort(-imp[idx])]
+    top = [(feat_names[i], imp[i]) for i in idx]
 
     logger.info("--- Top 15 Feature Importances (Best Tuned Model) ---")
     for name, val in top:
@@ -1,16 +1,16 @@
 from __future__ import annotations
 
 import logging
+import os
 from pathlib import Path
-from typing import Dict, Any, Callable, Tuple
+from typing import Dict, Any, Callable, List, Tuple
 
 import joblib
 import numpy as np
 import optuna
-import pandas as pd
 import polars as pl
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.impute import SimpleImputer
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.metrics import (
     mean_absolute_error,
     mean_squared_error,
@@ -18,7 +18,7 @@ from sklearn.metrics import (
     explained_variance_score,
 )
 from sklearn.model_selection import train_test_split
-from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
 
 # Logging
 LOG_FILE = "rf_model_runs.log"
@@ -38,7 +38,13 @@ Y_TEST_PATH = DATA_DIR / "y_test.parquet"
 
 ID_COL = "LSOA code"
 TARGET = "burglary_count"
-MODEL_OUTPUT_PATH = "final_random_forest.pkl"
+MODEL_OUTPUT_PATH = "final_hist_gradient_boosting.pkl"
+MEDIANS_OUTPUT_PATH = "final_hist_gradient_boosting_medians.pkl"
+# model sizes (boosting iterations) a trial grows through (warm start); pruning is checked after each one
+N_ITER_STEPS = (50, 100, 200, 400, 800)
+# trials run side by side in threads, each model on its share of the cores
+PARALLEL_TRIALS = 4
+THREADS_PER_TRIAL = max(1, (os.cpu_count() or 1) // PARALLEL_TRIALS)
 
 # Helpers – I/O
 def read_parquet(file_path: str | Path) -> pl.DataFrame:
@@ -46,60 +52,80 @@ def read_parquet(file_path: str | Path) -> pl.DataFrame:
     return pl.read_parquet(file_path)
 
 
+def _to_float32(file_path: str | Path, drop: str | None = None) -> pl.DataFrame:
+    lf = pl.scan_parquet(file_path)
+    if drop is not None:
+        lf = lf.drop(drop)
+    return lf.select(pl.all().cast(pl.Float32).fill_nan(None)).collect()
+
+
+def fill_medians(df: pl.DataFrame, medians: Dict[str, float | None]) -> pl.DataFrame:
+    """Fill missing values with the given (training) column medians."""
+    return df.with_columns(pl.col(c).fill_null(m) for c, m in medians.items() if m is not None)
+
+
 def load_dataset_splits(x_train_p: str | Path, y_train_p: str | Path, x_test_p: str | Path,
-                        y_test_p: str | Path) -> Tuple[pd.DataFrame, pd.DataFrame, np.ndarray, np.ndarray]:
+                        y_test_p: str | Path
+                        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, float | None],
+                                   List[str]]:
     """
-    Parquet → Polars → Pandas, dropping the identifier column and raveling the
-    target arrays.  All remaining columns are assumed numeric.
+    Parquet → Polars → C-contiguous float32 NumPy, dropping the identifier
+    column and raveling the target arrays.  All remaining columns are assumed
+    numeric.  Missing values in both splits are filled with the training
+    medians, which are returned together with the feature column names.
     """
-    X_train = read_parquet(x_train_p).drop(ID_COL).to_pandas()
-    X_test = read_parquet(x_test_p).drop(ID_COL).to_pandas()
+    X_train_pl = _to_float32(x_train_p, drop=ID_COL)
+    medians = X_train_pl.median().row(0, named=True)
+    X_train = fill_medians(X_train_pl, medians).to_numpy(order="c")
+    X_test = fill_medians(_to_float32(x_test_p, drop=ID_COL), medians).to_numpy(order="c")
 
-    y_train = read_parquet(y_train_p)[TARGET].to_numpy().ravel()
-    y_test = read_parquet(y_test_p)[TARGET].to_numpy().ravel()
+    y_train = _to_float32(y_train_p)[TARGET].to_numpy()
+    y_test = _to_float32(y_test_p)[TARGET].to_numpy()
 
-    return X_train, X_test, y_train, y_test
+    return X_train, X_test, y_train, y_test, medians, X_train_pl.columns
 
 
 # Optuna objective
-def build_objective(X_full: pd.DataFrame, y_full: np.ndarray) -> Callable[[optuna.trial.Trial], float]:
+def build_objective(X_full: np.ndarray, y_full: np.ndarray) -> Callable[[optuna.trial.Trial], float]:
     """
     • Split training data 80/20.
-    • Build Pipeline(Imputer → RF) with trial-sampled hyper-parameters.
-    • Return validation RMSE.
+    • Build a histogram-binned HistGradientBoostingRegressor with
+      trial-sampled hyper-parameters.
+    • Grow it through N_ITER_STEPS with warm_start, reporting the validation
+      RMSE after each step so the pruner can stop the trial.
+    • Return the validation RMSE of the full-size model.
     """
     X_tr, X_val, y_tr, y_val = train_test_split(
         X_full, y_full, test_size=0.3, random_state=42, shuffle=True
     )
 
     def objective(trial: optuna.trial.Trial) -> float:
-        rf_params: Dict[str, Any] = {
-            "n_estimators": trial.suggest_int("n_estimators", 100, 800),
+        hgb_params: Dict[str, Any] = {
+            "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
             "max_depth": trial.suggest_categorical(
                 "max_depth", [None] + list(range(3, 41))
             ),
-            "min_samples_split": trial.suggest_int("min_samples_split", 2, 20),
-            "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 20),
-            "max_features": trial.suggest_categorical(
-                "max_features", ["sqrt", "log2", 0.5, 0.7, 1.0]
-            ),
-            "bootstrap": trial.suggest_categorical("bootstrap", [True, False]),
-            "criterion": trial.suggest_categorical(
-                "criterion", ["squared_error", "friedman_mse", "absolute_error"]
-            ),
-            "n_jobs": -1,
+            "max_leaf_nodes": trial.suggest_int("max_leaf_nodes", 15, 255),
+            "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 100),
+            "l2_regularization": trial.suggest_float("l2_regularization", 1e-4, 10, log=True),
+            "loss": "squared_error",
+            "max_bins": 255,
+            "early_stopping": False,  # the pruner below decides when to stop
             "random_state": 42,
+            "warm_start": True,
         }
 
-        pipe = Pipeline(
-            steps=[
-                ("imputer", SimpleImputer(strategy="median")),
-                ("rf", RandomForestRegressor(**rf_params)),
-            ]
-        )
-        pipe.fit(X_tr, y_tr)
-        preds = pipe.predict(X_val)
-        rmse = np.sqrt(mean_squared_error(y_val, preds))
+        model = HistGradientBoostingRegressor(**hgb_params)
+        # the OpenMP thread count is per calling thread, so each parallel trial caps its own fits
+        with threadpool_limits(limits=THREADS_PER_TRIAL, user_api="openmp"):
+            for n in N_ITER_STEPS:
+                # warm_start keeps the iterations already fitted and only adds the new ones
+                model.set_params(max_iter=n)
+                model.fit(X_tr, y_tr)
+                rmse = np.sqrt(mean_squared_error(y_val, model.predict(X_val)))
+                trial.report(rmse, n)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
         return rmse
 
     return objective
@@ -109,33 +135,34 @@ def run_hyperparameter_optimization(objective: Callable[[optuna.trial.Trial], fl
                                     n_trials: int = 50) -> Dict[str, Any]:
     """
     Execute Optuna study, minimise RMSE, return best hyper-parameter dictionary.
+    Hyperband prunes trials whose models are clearly worse at the same size.
     """
     optuna.logging.set_verbosity(optuna.logging.WARNING)
-    study = optuna.create_study(direction="minimize")
-    logger.info("Running Optuna search (%d trials)…", n_trials)
-    study.optimize(objective, n_trials=n_trials, show_progress_bar=True)
+    pruner = optuna.pruners.HyperbandPruner(
+        min_resource=N_ITER_STEPS[0], max_resource=N_ITER_STEPS[-1], reduction_factor=3
+    )
+    study = optuna.create_study(direction="minimize", pruner=pruner)
+    logger.info("Running Optuna search (%d trials, %d at a time)…", n_trials, PARALLEL_TRIALS)
+    # HGB fits without the GIL, so threads overlap trials without copying the data
+    study.optimize(objective, n_trials=n_trials, n_jobs=PARALLEL_TRIALS, show_progress_bar=True)
     logger.info("Optuna finished.")
 
     logger.info("Best trial RMSE: %.4f", study.best_value)
     logger.info("Best parameters: %s", study.best_params)
-    return study.best_params
+    # completed trials always grew the full model
+    return {**study.best_params, "max_iter": N_ITER_STEPS[-1]}
 
 
 # Training / evaluation helpers
-def train_final_model(params: Dict[str, Any], X_train: pd.DataFrame, y_train: np.ndarray) -> RandomForestRegressor:
-    """Fit RF on the full training data with the chosen params."""
-    rf_best = RandomForestRegressor(**best_params, n_jobs=-1, random_state=42)
-    pipe = Pipeline(
-        steps=[
-            ("imputer", SimpleImputer(strategy="median")),
-            ("rf", rf_best),
-        ]
-    )
-    pipe.fit(X_train, y_train)
-    return pipe
+def train_final_model(params: Dict[str, Any], X_train: np.ndarray,
+                      y_train: np.ndarray) -> HistGradientBoostingRegressor:
+    """Fit the model on the full training data with the chosen params."""
+    model = HistGradientBoostingRegressor(**params, max_bins=255, early_stopping=False, random_state=42)
+    model.fit(X_train, y_train)
+    return model
 
 
-def evaluate_final_model(model: RandomForestRegressor, X_test: pd.DataFrame,
+def evaluate_final_model(model: HistGradientBoostingRegressor, X_test: np.ndarray,
                          y_test: np.ndarray) -> Tuple[float, float, float, float]:
     """Compute MAE, RMSE, R², EVS on the held-out test set."""
     preds = np.clip(model.predict(X_test), 0, None)  # keep predictions ≥ 0
@@ -157,7 +184,7 @@ def evaluate_final_model(model: RandomForestRegressor, X_test: pd.DataFrame,
     return mae, rmse, r2, evs
 
 
-def model_output(model: RandomForestRegressor, file_path: str | Path) -> None:
+def model_output(model: HistGradientBoostingRegressor, file_path: str | Path) -> None:
     """Serialise model to disk using joblib."""
     joblib.dump(model, file_path)
     logger.info("Model saved to %s", file_path)
@@ -166,31 +193,38 @@ def model_output(model: RandomForestRegressor, file_path: str | Path) -> None:
 if __name__ == "__main__":
     # -------------------- Data loading ------------------------------------ #
     logger.info("Loading data …")
-    X_train_df, X_test_df, y_train_arr, y_test_arr = load_dataset_splits(
+    X_train_arr, X_test_arr, y_train_arr, y_test_arr, train_medians, feature_names = load_dataset_splits(
         X_TRAIN_PATH, Y_TRAIN_PATH, X_TEST_PATH, Y_TEST_PATH
     )
-    logger.info("X_train: %s | X_test: %s", X_train_df.shape, X_test_df.shape)
+    logger.info("X_train: %s | X_test: %s", X_train_arr.shape, X_test_arr.shape)
     logger.info("y_train: %s | y_test: %s", y_train_arr.shape, y_test_arr.shape)
-    logger.info("Feature count: %d", X_train_df.shape[1])
+    logger.info("Feature count: %d", X_train_arr.shape[1])
 
     # -------------------- Hyper-parameter tuning -------------------------- #
-    objective_fn = build_objective(X_train_df, y_train_arr)
+    objective_fn = build_objective(X_train_arr, y_train_arr)
     best_params = run_hyperparameter_optimization(objective_fn, n_trials=50)
 
     # -------------------- Train final model ------------------------------- #
-    logger.info("Training final Random-Forest model …")
-    final_rf = train_final_model(best_params, X_train_df, y_train_arr)
+    logger.info("Training final model …")
+    final_model = train_final_model(best_params, X_train_arr, y_train_arr)
 
     # -------------------- Evaluate ---------------------------------------- #
-    evaluate_final_model(final_rf, X_test_df, y_test_arr)
+    evaluate_final_model(final_model, X_test_arr, y_test_arr)
 
     # -------------------- Feature importances ----------------------------- #
-    logger.info("--- Top 15 Feature Importances ---")
-    importances = final_rf.feature_importances_
-    top_idx = np.argsort(importances)[::-1][:15]
+    logger.info("--- Top 15 Feature Importances (permutation, test set) ---")
+    importances = permutation_importance(
+        final_model, X_test_arr, y_test_arr, n_repeats=5, random_state=42, n_jobs=-1
+    ).importances_mean
+    k = min(15, len(importances))
+    top_idx = np.argpartition(importances, -k)[-k:]
+    top_idx = top_idx[np.argsort(-importances[top_idx])]
     for idx in top_idx:
-        logger.info("%-45s %6.4f", X_train_df.columns[idx], importances[idx])
+        logger.info("%-45s %6.4f", feature_names[idx], importances[idx])
     logger.info("--- End of Feature Importances ---")
 
     # -------------------- Save model -------------------------------------- #
-    model_output(final_rf, MODEL_OUTPUT_PATH)
+    model_output(final_model, MODEL_OUTPUT_PATH)
+    # the model expects imputed inputs; keep the training medians for inference
+    joblib.dump(train_medians, MEDIANS_OUTPUT_PATH)
+    logger.info("Training medians saved to %s", MEDIANS_OUTPUT_PATH)
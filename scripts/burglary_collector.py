@@ -1,6 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-import csv, logging, os, polars as pl
-from tqdm.contrib.concurrent import process_map
+import logging, multiprocessing, os, polars as pl
+from tqdm import tqdm
 
 # Logging module
 logging.basicConfig(
@@ -9,21 +12,45 @@ logging.basicConfig(
     level=logging.INFO)
 
 
-def _filter_file(args):
-    path, valid_codes, lsoa_mapping, crime = args
-    rows = []
-    with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            lsoa_code = row["LSOA code"].strip()
-            if lsoa_code in lsoa_mapping:
-                lsoa_code = lsoa_mapping[lsoa_code]
-                row["LSOA code"] = lsoa_code
-            if (row["Crime ID"].strip() and
-                row["LSOA code"] in valid_codes and
-                row["Crime type"] == crime):
-                rows.append(row)
-    return rows
+# Month must stay "YYYY-MM" text (parsed later in normalize_time); empty fields read as null
+KEY_COLUMNS = {c: pl.String for c in ("Crime ID", "Month", "LSOA code", "Crime type")}
+
+
+def _filter_file(path, valid_codes: pl.Series, lsoa_mapping: tuple[pl.Series, pl.Series],
+                 crime: str) -> pl.DataFrame:
+    old_codes, new_codes = lsoa_mapping
+    lsoa = pl.col("LSOA code")
+    return (
+        pl.scan_csv(path, schema_overrides=KEY_COLUMNS)
+        .filter(
+            (pl.col("Crime type") == crime)
+            & (pl.col("Crime ID").str.strip_chars().str.len_chars() > 0)
+        )
+        # remap changed LSOA codes, then keep London ones
+        .with_columns(lsoa.str.strip_chars().replace_strict(old_codes, new_codes, default=lsoa).alias("LSOA code"))
+        .filter(lsoa.is_in(valid_codes.implode()))
+        .collect()
+    )
+
+
+@contextmanager
+def _worker_env(**env):
+    """Set environment variables for spawned workers, restoring the parent's values afterwards.
+
+    Polars sizes its thread pool on import, which a spawned worker does before any
+    initializer runs, so the variables have to be in place when the worker starts.
+    """
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
 
 def create_file(file_path: str, output_name: str, lsoa_path: str, crime: str = 'Burglary') -> None:
     """Create the crime dataset for London burglaries.
@@ -41,47 +68,37 @@ def create_file(file_path: str, output_name: str, lsoa_path: str, crime: str = '
     base_dir = Path(__file__).resolve().parent
     csv_files = list((base_dir / file_path).rglob("*-street.csv"))
     lsoa_df = pl.read_parquet(lsoa_path)
-    valid_codes = set(pl.read_parquet(lsoa_path)["LSOA21CD"])
+    valid_codes = lsoa_df["LSOA21CD"].unique().cast(pl.String)
 
     # Mapping for changed LSOA codes (S, M, X)
-    lsoa_mapping = {}
-    changes = lsoa_df.filter(pl.col("CHGIND").is_in(["S", "M", "X"]))
-    for row in changes.select(["LSOA11CD", "LSOA21CD"]).iter_rows(named=True):
-        lsoa_mapping[row["LSOA11CD"]] = row["LSOA21CD"]
+    changes = lsoa_df.filter(pl.col("CHGIND").is_in(["S", "M", "X"])).unique(subset="LSOA11CD", keep="last")
+    lsoa_mapping = (changes["LSOA11CD"].cast(pl.String), changes["LSOA21CD"].cast(pl.String))
 
     logging.info(f'Found {len(csv_files)} files.')
     logging.info(f'Found {len(valid_codes)} London LSOA codes')
 
-    chunks = process_map(
-        _filter_file,
-        [(p, valid_codes, lsoa_mapping, crime) for p in csv_files],
-        max_workers=os.cpu_count(),
-        chunksize=1,
-        desc="Processing files",
-        unit="files"
-    )
-
-    # Write everything the workers give us into one temporary CSV
-    tmp_csv = base_dir / "temp.csv"
-    with open(tmp_csv, "w", newline="") as out_f:
-        writer = None
-        for rows in chunks:
-            if not rows:
-                continue
-            if writer is None:
-                writer = csv.DictWriter(out_f, fieldnames=rows[0].keys())
-                writer.writeheader()
-            writer.writerows(rows)
-
-
-    # Convert to parquet & deduplicate
+    # one worker per physical core (half the logical ones on hyper-threaded CPUs)
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    # spawned workers import polars afresh (fork is unsafe with its thread pool), each with a
+    # single-threaded pool: the processes are the parallelism
+    filter_file = partial(_filter_file, valid_codes=valid_codes, lsoa_mapping=lsoa_mapping, crime=crime)
+    with _worker_env(POLARS_MAX_THREADS="1"), \
+         ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = list(tqdm(
+            pool.map(filter_file, csv_files, chunksize=max(1, len(csv_files) // (workers * 4))),
+            total=len(csv_files),
+            desc="Processing files",
+            unit="files"
+        ))
+
+    # Merge the per-file frames & deduplicate
     parquet_path = base_dir.parent / "data" / f"{output_name}.parquet"
     (
-        pl.read_csv(tmp_csv)
+        pl.concat([c.lazy() for c in chunks if c.height], how="vertical_relaxed")
+          .with_columns(pl.col(pl.Null).cast(pl.String))  # all-empty columns
           .unique(subset=["Crime ID"])
-          .write_parquet(parquet_path, compression="zstd", compression_level=3)
+          .sink_parquet(parquet_path, compression="zstd", compression_level=3)
     )
-    os.remove(tmp_csv)
     logging.info(f"Wrote {parquet_path}")
 
 